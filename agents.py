@@ -1,54 +1,76 @@
 """Agent implementations for the MARA application."""
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import re
+from typing import Dict, Any, Callable, Optional, List, Iterable, Iterator, Sequence
 import time
 
 import google.generativeai as genai
-import streamlit as st
-from google.generativeai.types import GenerationConfig, GenerateContentResponse
+from google.generativeai.types import (
+    GenerationConfig,
+    BlockedPromptException,
+    StopCandidateException,
+    BrokenResponseError
+)
 from google.api_core import exceptions
 
 from config import (
     PREANALYSIS_CONFIG,
-    ANALYSIS_CONFIG,
     SYNTHESIS_CONFIG,
+    ANALYSIS_FULL_HISTORY_TURNS,
+    INSIGHT_KEYS,
     ProgressiveConfig
 )
-from utils import rate_limit_decorator, GeminiAPIError
+from utils import GeminiAPIError, parse_literal
 
 logger = logging.getLogger(__name__)
 
+# Section layout for prior analyses embedded in prompts
+_ANALYSIS_SECTION_TEMPLATE = "\n## Research Analysis {index}\n### {title}\n{subtitle}{content}\n\n"
+
+# Outline extraction: list items are kept whole, prose is cut after its first sentence
+_LIST_ITEM_RE = re.compile(r"(#|[*+>-]|\d+[.)])\s*")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+# Finish reasons a chat session accepts into its history
+_COMPLETE_FINISH_REASONS = (
+    genai.protos.Candidate.FinishReason.FINISH_REASON_UNSPECIFIED,
+    genai.protos.Candidate.FinishReason.STOP,
+    genai.protos.Candidate.FinishReason.MAX_TOKENS,
+)
+
 class BaseAgent:
     """Base class for all agents."""
     
     def __init__(self, model):
         self.model = model
     
-    def _generate_with_backoff(self, prompt: str, max_retries: int = 3) -> Optional[str]:
+    def _generate_with_backoff(self, prompt: str, config: Optional[Dict] = None, max_retries: int = 3) -> Optional[str]:
         """Generate content with compliant error handling and retries."""
+        generation_config = GenerationConfig(**config) if config else None
         for retry in range(max_retries):
             try:
-                response = self.model.generate_content(prompt)
+                response = self.model.generate_content(prompt, generation_config=generation_config)
                 
                 # Check for content filtering
                 if hasattr(response, 'prompt_feedback'):
                     feedback = response.prompt_feedback
                     if feedback and feedback.block_reason:
-                        logger.warning(f"Content blocked: {feedback.block_reason}")
+                        logger.warning("Content blocked: %s", feedback.block_reason)
                         return None
                 
                 if response and response.text:
                     return response.text.strip()
                     
             except exceptions.GoogleAPIError as e:
-                logger.error(f"Gemini API error (attempt {retry + 1}): {str(e)}")
+                logger.error("Gemini API error (attempt %d): %s", retry + 1, e)
                 if retry < max_retries - 1:
                     time.sleep(2 ** retry)  # Exponential backoff
                 else:
                     raise GeminiAPIError(f"Gemini API error: {str(e)}", error_type="API_ERROR")
             except Exception as e:
-                logger.error(f"Unexpected error (attempt {retry + 1}): {str(e)}")
+                logger.error("Unexpected error (attempt %d): %s", retry + 1, e)
                 if retry < max_retries - 1:
                     time.sleep(2 ** retry)
                 else:
@@ -58,9 +80,7 @@ class BaseAgent:
     def generate_content(self, prompt: str, config: Optional[Dict] = None) -> Optional[str]:
         """Generate content with the specified configuration."""
         try:
-            if config:
-                self.model.generation_config = GenerationConfig(**config)
-            response = self._generate_with_backoff(prompt)
+            response = self._generate_with_backoff(prompt, config)
             if response:
                 # Clean up the response following Google's guidelines
                 response = response.replace('\\"', '"')
@@ -72,15 +92,110 @@ class BaseAgent:
         except Exception as e:
             raise GeminiAPIError(f"Content generation error: {str(e)}", error_type="UNEXPECTED_ERROR")
 
+    def generate_content_stream(self, prompt: str, config: Optional[Dict] = None) -> Iterator[str]:
+        """Stream generated text chunks as they arrive."""
+        generation_config = GenerationConfig(**config) if config else None
+        yield from self._stream_text(
+            lambda: self.model.generate_content(prompt, generation_config=generation_config, stream=True)
+        )
+
+    def _stream_text(
+        self,
+        start_stream: Callable[[], Iterable[Any]],
+        max_retries: int = 3,
+        discard: Optional[Callable[[], None]] = None
+    ) -> Iterator[str]:
+        """Yield text from a streaming response, mapping API errors."""
+        # Opening is retried with backoff until the first text arrives; discard undoes a failed attempt
+        for retry in range(max_retries):
+            started = False
+            try:
+                for chunk in start_stream():
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunks without text parts (e.g. safety or finish metadata)
+                        continue
+                    if text:
+                        started = True
+                        yield text
+                return
+            except exceptions.GoogleAPIError as e:
+                logger.error("Gemini API error while streaming (attempt %d): %s", retry + 1, e)
+                if discard:
+                    discard()
+                # Text already shown cannot be taken back, so only retry before the first chunk
+                if started or retry == max_retries - 1:
+                    raise GeminiAPIError(f"Gemini API error: {str(e)}", error_type="API_ERROR")
+                time.sleep(2 ** retry)
+            except (BlockedPromptException, StopCandidateException, BrokenResponseError) as e:
+                # Blocked or broken turns fail the same way on every attempt
+                logger.warning("Streamed response was blocked or broken: %s", e)
+                if discard:
+                    discard()
+                raise GeminiAPIError(f"Response blocked: {str(e)}", error_type="BLOCKED")
+
+    def _parse_markdown_report(self, text: Optional[str], default_title: str) -> Optional[Dict[str, str]]:
+        """Split a '# Title', '*Subtitle*', content markdown report into its parts."""
+        if not text or not text.strip():
+            return None
+        
+        lines = text.strip().splitlines()
+        title = default_title
+        subtitle = ""
+        
+        # Leading '# ' line is the title
+        if lines and lines[0].startswith('# '):
+            title = lines.pop(0)[2:].strip()
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        
+        # Following emphasized line is the subtitle
+        if lines:
+            candidate = lines[0].strip()
+            if len(candidate) > 2 and candidate[0] in '*_' and candidate[-1] == candidate[0]:
+                subtitle = candidate.strip('*_').strip()
+                lines.pop(0)
+        
+        content = '\n'.join(lines).strip()
+        if not content:
+            return None
+        
+        return {
+            "title": title,
+            "subtitle": subtitle,
+            "content": content.replace('\\n', '\n')
+        }
+
+    def _format_analyses(self, analyses: List[Dict[str, str]]) -> str:
+        """Format analyses as structured text for use in a prompt."""
+        sections = []
+        for i, analysis in enumerate(analyses, 1):
+            try:
+                if isinstance(analysis, dict):
+                    subtitle = analysis.get('subtitle')
+                    sections.append(_ANALYSIS_SECTION_TEMPLATE.format(
+                        index=i,
+                        title=analysis.get('title', ''),
+                        subtitle=f"#### {subtitle}\n" if subtitle else "",
+                        content=analysis.get('content', '')
+                    ))
+                else:
+                    sections.append(f"Analysis {i}: {str(analysis)}\n\n")
+            except Exception as e:
+                logger.error("Error formatting analysis %d: %s", i, e)
+                continue
+        return "".join(sections)
+
 class PreAnalysisAgent(BaseAgent):
     """Agent responsible for initial analysis and insights."""
     
     def generate_insights(self, topic: str) -> Optional[Dict[str, str]]:
         """Generate initial insights about the topic."""
-        prompt = f"""Analyze '{topic}' and provide two insights:
+        prompt = f"""Analyze the topic given at the end and provide two insights:
 
 1. Did You Know: Share one fascinating, lesser-known fact about the topic. Keep it to a single clear sentence. Include 1-3 relevant emojis placed naturally within the text where they are most contextually relevant (not grouped at the start).
-2. Overview: If '{topic}' is a question, provide a clear, direct answer. Otherwise, provide a clear, accessible 2-3 sentence explanation for a general audience. Focus on key points and avoid technical jargon. Include 1-3 relevant emojis placed naturally within the text where they are most contextually relevant (not grouped at the start).
+2. Overview: If the topic is a question, provide a clear, direct answer. Otherwise, provide a clear, accessible 2-3 sentence explanation for a general audience. Focus on key points and avoid technical jargon. Include 1-3 relevant emojis placed naturally within the text where they are most contextually relevant (not grouped at the start).
 
 Format your response EXACTLY as shown below, including the comma between key-value pairs:
 {{"did_you_know": "Your fact here with contextual emojis", "eli5": "Your overview here with contextual emojis"}}
@@ -92,7 +207,9 @@ Important:
 - No line breaks in the dictionary
 - Keep the exact keys: did_you_know, eli5
 - Ensure proper dictionary formatting with comma between key-value pairs
-- Avoid nested quotes or special characters"""
+- Avoid nested quotes or special characters
+
+Topic: {topic}"""
         
         try:
             result = self.generate_content(prompt, PREANALYSIS_CONFIG)
@@ -107,52 +224,44 @@ Important:
             
             # Try multiple parsing approaches
             try:
-                # First try ast.literal_eval for safety
-                import ast
-                insights = ast.literal_eval(result)
-            except:
-                try:
-                    # Try json.loads as fallback
-                    import json
-                    insights = json.loads(result)
-                except:
-                    # Last resort: basic string manipulation
-                    # Extract content between curly braces
-                    content = result[result.find('{'): result.rfind('}') + 1]
-                    # Split by comma and extract key-value pairs
-                    pairs = content.strip('{}').split('",')
-                    insights = {}
-                    for pair in pairs:
-                        if ':' in pair:
-                            key, value = pair.split(':', 1)
-                            key = key.strip().strip('"').strip()
-                            value = value.strip().strip('"').strip()
-                            insights[key] = value
+                insights = parse_literal(result)
+            except ValueError:
+                # Last resort: basic string manipulation
+                # Extract content between curly braces
+                content = result[result.find('{'): result.rfind('}') + 1]
+                # Split by comma and extract key-value pairs
+                pairs = content.strip('{}').split('",')
+                insights = {}
+                for pair in pairs:
+                    if ':' in pair:
+                        key, value = pair.split(':', 1)
+                        key = key.strip().strip('"').strip()
+                        value = value.strip().strip('"').strip()
+                        insights[key] = value
             
             # Validate the dictionary structure
             if not isinstance(insights, dict):
                 logger.error("Response is not a dictionary")
                 return None
                 
-            required_keys = {'did_you_know', 'eli5'}
-            if not all(key in insights for key in required_keys):
+            if not INSIGHT_KEYS.issubset(insights):
                 logger.error("Response missing required keys")
                 return None
                 
             # Clean up values
-            for key in required_keys:
+            for key in INSIGHT_KEYS:
                 if key in insights:
                     insights[key] = insights[key].strip().strip('"\'').strip()
             
             return insights
             
         except Exception as e:
-            logger.error(f"Error parsing insights response: {str(e)}")
+            logger.error("Error parsing insights response: %s", e)
             return None
     
     def generate_focus_areas(self, topic: str) -> Optional[List[str]]:
         """Generate potential focus areas for research."""
-        prompt = f"""For '{topic}', suggest 8-10 diverse research focus areas that:
+        prompt = f"""For the topic given at the end, suggest 8-10 diverse research focus areas that:
 1. Cover different aspects and perspectives
 2. Include both obvious and non-obvious angles
 3. Span theoretical and practical implications
@@ -169,7 +278,9 @@ Important:
 - Each focus area should be concise (3-7 words)
 - Make each area distinct and specific
 - Ensure areas are relevant to the topic
-- Return ONLY the list, no additional text"""
+- Return ONLY the list, no additional text
+
+Topic: {topic}"""
         
         try:
             result = self.generate_content(prompt, PREANALYSIS_CONFIG)
@@ -195,19 +306,12 @@ Important:
             
             # Try multiple parsing approaches
             try:
-                # First try ast.literal_eval for safety
-                import ast
-                focus_areas = ast.literal_eval(result)
-            except:
-                try:
-                    # Try json.loads as fallback
-                    import json
-                    focus_areas = json.loads(result)
-                except:
-                    # Last resort: basic string manipulation
-                    # Remove brackets and split by commas
-                    items = result.strip('[]').split('",')
-                    focus_areas = [item.strip().strip('"').strip() for item in items if item.strip()]
+                focus_areas = parse_literal(result)
+            except ValueError:
+                # Last resort: basic string manipulation
+                # Remove brackets and split by commas
+                items = result.strip('[]').split('",')
+                focus_areas = [item.strip().strip('"').strip() for item in items if item.strip()]
             
             # Validate the result
             if not isinstance(focus_areas, list):
@@ -222,105 +326,193 @@ Important:
             
             # Ensure we have enough valid focus areas
             if not (8 <= len(cleaned_areas) <= 10):
-                logger.error(f"Invalid number of focus areas: {len(cleaned_areas)}")
+                logger.error("Invalid number of focus areas: %d", len(cleaned_areas))
                 return None
                 
             return cleaned_areas
             
         except Exception as e:
-            logger.error(f"Error parsing focus areas response: {str(e)}")
+            logger.error("Error parsing focus areas response: %s", e)
             return None
+    
+    async def generate_insights_async(self, topic: str) -> Optional[Dict[str, str]]:
+        """Generate quick insights without blocking the event loop."""
+        return await asyncio.to_thread(self.generate_insights, topic)
+    
+    async def generate_focus_areas_async(self, topic: str) -> Optional[List[str]]:
+        """Generate focus areas without blocking the event loop."""
+        return await asyncio.to_thread(self.generate_focus_areas, topic)
 
 class ResearchAnalyst(BaseAgent):
     """Agent responsible for conducting iterative research analysis."""
     
-    def analyze(self, topic: str, focus_areas: List[str], previous_analysis: Optional[str] = None) -> Dict[str, str]:
-        """Generate research analysis for the given topic and focus areas."""
-        try:
-            # Calculate iteration number based on previous analysis
-            iteration = 1
-            if previous_analysis:
-                iteration = len([a for a in previous_analysis.split('\n') if a.startswith('Title:')]) + 1
+    @staticmethod
+    def _iteration_guidance(iteration: int) -> str:
+        """Describe how deep a chained iteration should go."""
+        return (
+            "focus on foundational aspects and key concepts" if iteration == 1 else
+            "build upon previous findings and explore deeper connections" if iteration == 2 else
+            "delve into nuanced implications and complex relationships" if iteration == 3 else
+            "synthesize insights and explore innovative perspectives" if iteration == 4 else
+            "push boundaries and explore transformative implications"
+        )
 
-            # Get configuration for this iteration
-            config = ProgressiveConfig.get_iteration_config(iteration)
-            
-            prompt = f'''Analyze the topic "{topic}" focusing on recent developments and key insights.
-            
-Previous analysis (if any): {previous_analysis if previous_analysis else "None"}
-Focus areas: {", ".join(focus_areas) if focus_areas else "General analysis"}
+    @staticmethod
+    def _standalone_guidance(iteration: int) -> str:
+        """Describe the angle of an iteration that runs without seeing the others."""
+        return (
+            "focus on foundational aspects and key concepts" if iteration == 1 else
+            "focus on the mechanisms and connections that drive the topic" if iteration == 2 else
+            "focus on nuanced implications and complex relationships" if iteration == 3 else
+            "focus on innovative perspectives and emerging developments" if iteration == 4 else
+            "focus on transformative implications and long-term directions"
+        )
+
+    def _build_prompt(self, topic: str, focus_areas: List[str], guidance: str) -> str:
+        """Build the analysis prompt for one iteration."""
+        return f'''Analyze the topic given below, focusing on recent developments and key insights.
 
 Important notes:
 1. Create a unique, specific title that captures the essence of your analysis
 2. Write a subtitle that previews your key findings
 3. Structure your analysis with clear sections and bullet points
 4. Use markdown formatting for headings and emphasis
-5. As this is iteration {iteration}, {
-    "focus on foundational aspects and key concepts" if iteration == 1 else
-    "build upon previous findings and explore deeper connections" if iteration == 2 else
-    "delve into nuanced implications and complex relationships" if iteration == 3 else
-    "synthesize insights and explore innovative perspectives" if iteration == 4 else
-    "push boundaries and explore transformative implications"
-}
-6. Return your response in this exact format:
-{{
-    "title": "Your Unique Title Here",
-    "subtitle": "Your Subtitle Here",
-    "content": "Your Analysis Content Here"
-}}
+5. Return your response as markdown in this exact layout:
+# Your Unique Title Here
+*Your Subtitle Here*
+
+Your analysis content here, using ## for section headings
 
 Remember:
 - Make titles specific and informative
 - Use bullet points for key findings
 - Include evidence and examples
-- Build on previous analysis if provided
-- Focus on selected areas if specified'''
+- Focus on selected areas if specified
 
-            response = self._generate_with_backoff(prompt)
-            if not response:
-                return None
-            
-            # Clean and parse the response
-            cleaned_response = response.strip()
-            if not cleaned_response.startswith('{'):
-                cleaned_response = '{' + cleaned_response
-            if not cleaned_response.endswith('}'):
-                cleaned_response = cleaned_response + '}'
-                
-            # Parse response
-            try:
-                import ast
-                result = ast.literal_eval(cleaned_response)
-            except:
-                try:
-                    import json
-                    result = json.loads(cleaned_response)
-                except:
-                    # Last resort parsing
-                    parts = cleaned_response.split('",')
-                    title = parts[0].split('"title": "')[1]
-                    subtitle = parts[1].split('"subtitle": "')[1]
-                    content = parts[2].split('"content": "')[1].rstrip('"}')
-                    result = {
-                        "title": title,
-                        "subtitle": subtitle,
-                        "content": content.replace('\\n', '\n')
-                    }
-            
-            # Validate the result
-            required_keys = ['title', 'subtitle', 'content']
-            if not all(key in result for key in required_keys):
-                raise ValueError("Missing required keys in analysis response")
-                
-            # Clean up content formatting
-            if 'content' in result:
-                result['content'] = result['content'].replace('\\n', '\n')
-                
-            return result
+Topic: {topic}
+Focus areas: {", ".join(focus_areas) if focus_areas else "General analysis"}
 
-        except Exception as e:
-            logger.error(f"Error generating analysis: {str(e)}")
-            return None
+{guidance}.'''
+
+    def parse_analysis(self, text: Optional[str], iteration: int = 1) -> Optional[Dict[str, str]]:
+        """Split a markdown analysis into title, subtitle, and content."""
+        return self._parse_markdown_report(text, f"Research Analysis {iteration}")
+
+    @staticmethod
+    def _outline(text: str) -> str:
+        """Condense an analysis to its headings, list items and the lead sentence of each paragraph."""
+        lines = []
+        paragraph_start = True
+        for line in text.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                # Paragraph breaks are kept so that outlining an outline changes nothing
+                if lines and lines[-1]:
+                    lines.append('')
+                paragraph_start = True
+            elif _LIST_ITEM_RE.match(stripped):
+                lines.append(line)
+                paragraph_start = True
+            elif paragraph_start:
+                lines.append(_SENTENCE_END_RE.split(stripped, 1)[0])
+                paragraph_start = False
+        if lines and not lines[-1]:
+            lines.pop()
+        return '\n'.join(lines)
+
+    def _condense_history(self, history: List[Any]) -> List[Dict[str, Any]]:
+        """Outline the analysis that has just left the verbatim window of a chat history."""
+        # The whole history is sent with every turn, so verbatim analyses would make
+        # prompts grow quadratically; older turns were outlined when they left the window
+        model_turns = [i for i, content in enumerate(history) if content.role == 'model']
+        leaving = model_turns[-ANALYSIS_FULL_HISTORY_TURNS - 1] if len(model_turns) > ANALYSIS_FULL_HISTORY_TURNS else None
+        
+        turns = []
+        for i, content in enumerate(history):
+            text = "".join(part.text for part in content.parts)
+            turns.append({'role': content.role, 'parts': [self._outline(text) if i == leaving else text]})
+        return turns
+
+    def _session_prompt(self, topic: str, focus_areas: List[str], iteration: int, first_turn: bool) -> str:
+        """Message sent for one iteration of an analysis chat session."""
+        if first_turn:
+            return self._build_prompt(
+                topic, focus_areas, f"As this is iteration {iteration}, {self._iteration_guidance(iteration)}"
+            )
+        return f'''Continue with iteration {iteration} of the analysis of "{topic}".
+Your previous analyses are above; for this iteration, {self._iteration_guidance(iteration)}.
+Do not repeat earlier findings. Use the same markdown layout: a '# ' title line, an *italic* subtitle line, then the content.'''
+
+    def start_session(
+        self,
+        topic: str,
+        focus_areas: List[str],
+        previous_texts: Sequence[str] = ()
+    ) -> genai.ChatSession:
+        """Start a chat session that carries analyses across iterations."""
+        # Replaying previous_texts as model turns resumes after iterations reused from cache
+        history = []
+        recent = len(previous_texts) - ANALYSIS_FULL_HISTORY_TURNS
+        for iteration, text in enumerate(previous_texts, 1):
+            history.append({'role': 'user', 'parts': [self._session_prompt(topic, focus_areas, iteration, iteration == 1)]})
+            history.append({'role': 'model', 'parts': [text if iteration > recent else self._outline(text)]})
+        return self.model.start_chat(history=history)
+
+    @staticmethod
+    def _discard_turn(session: genai.ChatSession) -> None:
+        """Drop a failed turn so it is neither retried on top of nor kept in history."""
+        # The turn is recorded only once the stream has opened
+        if session.last is not None:
+            session.rewind()
+
+    def analyze_in_session_stream(
+        self,
+        session: genai.ChatSession,
+        topic: str,
+        focus_areas: List[str],
+        iteration: int
+    ) -> Iterator[str]:
+        """Stream the next iteration of an analysis chat session."""
+        # Later turns only send the iteration guidance; the history is condensed, not a stable prefix
+        if session.history:
+            session.history = self._condense_history(session.history)
+        prompt = self._session_prompt(topic, focus_areas, iteration, not session.history)
+        config = GenerationConfig(**ProgressiveConfig.get_iteration_config(iteration))
+        yield from self._stream_text(
+            lambda: session.send_message(prompt, generation_config=config, stream=True),
+            discard=lambda: self._discard_turn(session)
+        )
+        
+        # A turn cut short by safety or recitation filters would break the session history
+        response = session.last
+        if response is not None and response.candidates:
+            finish_reason = response.candidates[0].finish_reason
+            if finish_reason not in _COMPLETE_FINISH_REASONS:
+                session.rewind()
+                raise GeminiAPIError(
+                    f"Analysis stopped early: {finish_reason.name}",
+                    error_type="INCOMPLETE_RESPONSE"
+                )
+
+    def analyze_stream(
+        self,
+        topic: str,
+        focus_areas: List[str],
+        iteration: int,
+        standalone: bool = True
+    ) -> Iterator[str]:
+        """Stream one iteration outside a chat session; parse the joined text with parse_analysis."""
+        # A non-standalone prompt is a chained session's opening turn, so start_session can replay it
+        if standalone:
+            prompt = self._build_prompt(
+                topic,
+                focus_areas,
+                f"This is analysis {iteration} of several written in parallel from different angles; "
+                f"{self._standalone_guidance(iteration)}"
+            )
+        else:
+            prompt = self._session_prompt(topic, focus_areas, iteration, True)
+        yield from self.generate_content_stream(prompt, ProgressiveConfig.get_iteration_config(iteration))
 
 class SynthesisExpert(BaseAgent):
     """Agent responsible for synthesizing findings into a comprehensive, expert-level report."""
@@ -368,33 +560,20 @@ class SynthesisExpert(BaseAgent):
         formatted_content = main_content.rstrip('"}') + "\n\n## References\n\n" + '\n'.join(formatted_refs)
         return formatted_content
 
-    def synthesize(self, topic: str, focus_areas: Optional[List[str]], analyses: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
-        """Synthesize multiple analyses into a cohesive, expert-level report with clear organization and recommendations."""
-        # Cache key for persistence
-        synthesis_key = f"synthesis_{topic}"
-        
-        # Check if synthesis already exists in session state
-        if synthesis_key in st.session_state:
-            return st.session_state[synthesis_key]
-
+    def _build_prompt(self, topic: str, focus_areas: Optional[List[str]], analyses: List[Dict[str, str]]) -> str:
+        """Build the synthesis prompt from the completed analyses."""
         # Convert analyses list to formatted string with improved structure
         analyses_text = self._format_analyses(analyses)
         
         focus_context = f"\nSelected Focus Areas:\n{', '.join(focus_areas)}" if focus_areas else ""
         
-        prompt = f'''Topic: {topic}{focus_context}
+        return f'''As an expert in fields relevant to the topic given at the end and an engaging writer, create a comprehensive synthesis of the research findings. Adopt the perspective of a subject matter expert and skilled communicator to make complex ideas accessible while maintaining intellectual rigor.
 
-Previous Analyses:
-{analyses_text}
-
-As an expert in fields relevant to {topic} and an engaging writer, create a comprehensive synthesis of the research findings. Adopt the perspective of a subject matter expert and skilled communicator to make complex ideas accessible while maintaining intellectual rigor.
+Return your response as markdown in this exact layout:
+# Your creative, specific title that captures the key insight
+*Your engaging subtitle that previews the main findings*
 
-Return your response in this exact format:
-{{
-    "title": "Your creative, specific title that captures the key insight",
-    "subtitle": "Your engaging subtitle that previews the main findings",
-    "content": "Your detailed synthesis here"
-}}
+Your detailed synthesis here
 
 Required sections and formatting:
 1. Executive Summary
@@ -439,75 +618,29 @@ Use markdown formatting:
 - Define technical terms when introduced
 - Use clear topic sentences and transitions
 - Provide concrete examples
-- Balance depth with clarity'''
+- Balance depth with clarity
+
+Topic: {topic}{focus_context}
 
+Previous Analyses:
+{analyses_text}'''
+
+    def parse_synthesis(self, text: Optional[str]) -> Optional[Dict[str, str]]:
+        """Parse a markdown synthesis and format its references."""
+        result = self._parse_markdown_report(text, "Research Synthesis")
+        if result:
+            result['content'] = self._format_references(result['content'])
+        return result
+
+    def synthesize(self, topic: str, focus_areas: Optional[List[str]], analyses: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """Synthesize multiple analyses into a cohesive, expert-level report with clear organization and recommendations."""
         try:
-            response = self._generate_with_backoff(prompt)
-            if not response:
-                return None
-                
-            # Clean and parse the response
-            cleaned_response = response.strip()
-            if not cleaned_response.startswith('{'):
-                cleaned_response = '{' + cleaned_response
-            if not cleaned_response.endswith('}'):
-                cleaned_response = cleaned_response + '}'
-            
-            # Parse response
-            try:
-                import ast
-                result = ast.literal_eval(cleaned_response)
-            except:
-                try:
-                    import json
-                    result = json.loads(cleaned_response)
-                except:
-                    # Last resort parsing
-                    parts = cleaned_response.split('",')
-                    title = parts[0].split('"title": "')[1]
-                    subtitle = parts[1].split('"subtitle": "')[1]
-                    content = parts[2].split('"content": "')[1].rstrip('"}')
-                    result = {
-                        "title": title,
-                        "subtitle": subtitle,
-                        "content": content.replace('\\n', '\n')
-                    }
-            
-            # Validate and clean result
-            required_keys = ['title', 'subtitle', 'content']
-            if not all(key in result for key in required_keys):
-                raise ValueError("Missing required keys in synthesis response")
-            
-            # Clean up content formatting
-            if 'content' in result:
-                result['content'] = result['content'].replace('\\n', '\n')
-            
-            # Format references in the result
-            if result and 'content' in result:
-                result['content'] = self._format_references(result['content'])
-            
-            # Store in session state for persistence
-            st.session_state[synthesis_key] = result
-            return result
-            
+            prompt = self._build_prompt(topic, focus_areas, analyses)
+            return self.parse_synthesis(self._generate_with_backoff(prompt, SYNTHESIS_CONFIG))
         except Exception as e:
-            logger.error(f"Error generating synthesis: {str(e)}")
+            logger.error("Error generating synthesis: %s", e)
             return None
 
-    def _format_analyses(self, analyses: List[Dict[str, str]]) -> str:
-        """Format analyses for synthesis input with improved structure."""
-        formatted_text = ""
-        for i, analysis in enumerate(analyses, 1):
-            try:
-                if isinstance(analysis, dict):
-                    formatted_text += f"\n## Research Analysis {i}\n"
-                    formatted_text += f"### {analysis.get('title', '')}\n"
-                    if 'subtitle' in analysis:
-                        formatted_text += f"#### {analysis['subtitle']}\n"
-                    formatted_text += f"{analysis.get('content', '')}\n\n"
-                else:
-                    formatted_text += f"Analysis {i}: {str(analysis)}\n\n"
-            except Exception as e:
-                logger.error(f"Error formatting analysis {i}: {str(e)}")
-                continue
-        return formatted_text 
\ No newline at end of file
+    def synthesize_stream(self, topic: str, focus_areas: Optional[List[str]], analyses: List[Dict[str, str]]) -> Iterator[str]:
+        """Stream the synthesis text as it is generated; parse with parse_synthesis."""
+        yield from self.generate_content_stream(self._build_prompt(topic, focus_areas, analyses), SYNTHESIS_CONFIG)
@@ -0,0 +1,183 @@
+"""Semantic response cache for the MARA application."""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import google.generativeai as genai
+import numpy as np
+import streamlit as st
+
+from config import (
+    GEMINI_MODEL, EMBEDDING_MODEL, SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_PATH, PREANALYSIS_PROMPT_VERSION
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+@lru_cache(maxsize=SEMANTIC_CACHE_MAX_ENTRIES)
+def _embed_text(text: str) -> np.ndarray:
+    """Embed text as a read-only unit vector; resubmitted topics skip the API call."""
+    result = genai.embed_content(
+        model=EMBEDDING_MODEL,
+        content=text,
+        task_type="semantic_similarity"
+    )
+    
+    vector = np.asarray(result['embedding'], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if not norm:
+        raise ValueError("Embedding has zero length")
+    
+    vector = vector / norm
+    vector.setflags(write=False)
+    return vector
+
+class SemanticCache:
+    """Cache agent responses keyed by topic embedding similarity, per stage."""
+    
+    # One normalized embedding matrix per stage in memory, persisted to SQLite when a path is given
+    def __init__(self, threshold: float, max_entries: int, db_path: Optional[str] = None, namespace: str = ""):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Stage keys carry the namespace, so entries from another model or prompt version never match
+        self.namespace = namespace
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        if db_path:
+            self._open_db(db_path)
+    
+    def _open_db(self, db_path: str) -> None:
+        """Open the backing database and load the most recent entries."""
+        try:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "stage TEXT NOT NULL, embedding BLOB NOT NULL, response TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_stage_ts ON entries (stage, ts)")
+            self._db.commit()
+            
+            prefix = self._key("")
+            rows = self._db.execute(
+                "SELECT stage, embedding, response FROM entries WHERE substr(stage, 1, ?) = ? ORDER BY ts",
+                (len(prefix), prefix)
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Semantic cache database unavailable, using memory only: %s", e)
+            self._db = None
+            return
+        
+        for stage, blob, response in rows:
+            self._append(stage, np.frombuffer(blob, dtype=np.float32), json.loads(response))
+        logger.info("Loaded %d semantic cache entries from %s", len(rows), db_path)
+    
+    def _key(self, stage: str) -> str:
+        """Stage key qualified by the cache namespace."""
+        return f"{self.namespace}/{stage}" if self.namespace else stage
+    
+    def _append(self, stage: str, embedding: np.ndarray, value: Any) -> None:
+        """Add an entry to the in-memory index, evicting the oldest when full."""
+        matrix = self._matrices.get(stage)
+        values = self._values.setdefault(stage, [])
+        if matrix is not None and matrix.shape[1] != embedding.shape[0]:
+            # Embedding model changed; older vectors are not comparable
+            matrix = None
+            values.clear()
+        
+        row = embedding[np.newaxis, :]
+        self._matrices[stage] = row if matrix is None else np.vstack((matrix, row))
+        values.append(value)
+        
+        if len(values) > self.max_entries:
+            self._matrices[stage] = self._matrices[stage][-self.max_entries:]
+            del values[:-self.max_entries]
+    
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed text as a unit vector, or None if embedding fails."""
+        try:
+            # Failures raise, so lru_cache only memoizes successful embeddings
+            return _embed_text(text)
+        except Exception as e:
+            logger.warning("Embedding failed, bypassing semantic cache: %s", e)
+            return None
+    
+    def lookup(self, stage: str, embedding: np.ndarray) -> Optional[Any]:
+        """Return the closest cached value for a stage above the similarity threshold."""
+        stage = self._key(stage)
+        with self._lock:
+            matrix = self._matrices.get(stage)
+            if matrix is None or matrix.shape[1] != embedding.shape[0]:
+                return None
+            
+            # Vectors are normalized, so the dot product is the cosine similarity
+            scores = matrix @ embedding
+            # Ties go to the newest entry, so a refreshed response replaces the old one
+            best = len(scores) - 1 - int(np.argmax(scores[::-1]))
+            if scores[best] < self.threshold:
+                return None
+            
+            logger.info("Semantic cache hit for %s (similarity %.3f)", stage, scores[best])
+            return copy.deepcopy(self._values[stage][best])
+    
+    def insert(self, stage: str, embedding: np.ndarray, value: Any) -> None:
+        """Store a value for a stage in memory and, if configured, on disk."""
+        stage = self._key(stage)
+        with self._lock:
+            self._append(stage, embedding, copy.deepcopy(value))
+            if self._db is None:
+                return
+            
+            try:
+                self._db.execute(
+                    "INSERT INTO entries (stage, embedding, response, ts) VALUES (?, ?, ?, ?)",
+                    (stage, embedding.astype(np.float32).tobytes(), json.dumps(value), time.time())
+                )
+                # Keep the table bounded like the in-memory index
+                self._db.execute(
+                    "DELETE FROM entries WHERE stage = ? AND rowid NOT IN ("
+                    "SELECT rowid FROM entries WHERE stage = ? ORDER BY ts DESC LIMIT ?)",
+                    (stage, stage, self.max_entries)
+                )
+                self._db.commit()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning("Failed to persist semantic cache entry: %s", e)
+    
+    async def get_or_compute_async(
+        self,
+        stage: str,
+        embedding: Optional[np.ndarray],
+        compute: Callable[[], Awaitable[Optional[T]]],
+        refresh: bool = False
+    ) -> Optional[T]:
+        """Return a cached value for the stage, or await compute and store a new one."""
+        cached = self.lookup(stage, embedding) if embedding is not None and not refresh else None
+        if cached is not None:
+            return cached
+        
+        value = await compute()
+        if value and embedding is not None:
+            self.insert(stage, embedding, value)
+        return value
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_cache() -> SemanticCache:
+    """Get the process-wide semantic cache."""
+    return SemanticCache(
+        SEMANTIC_CACHE_THRESHOLD,
+        SEMANTIC_CACHE_MAX_ENTRIES,
+        SEMANTIC_CACHE_PATH,
+        namespace=f"{GEMINI_MODEL}/v{PREANALYSIS_PROMPT_VERSION}"
+    )
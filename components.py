@@ -1,13 +1,24 @@
 """UI components for the MARA application."""
 
+import asyncio
+import time
+from pathlib import Path
+
 import streamlit as st
-from typing import Dict, List, Callable
+from typing import Dict, List, Callable, Iterable, Iterator, Optional
 
+from config import LOGO_PATH, STREAM_FLUSH_INTERVAL, STREAM_FLUSH_CHARS
 from state import AppState
+from utils import clean_markdown_content, format_result_markdown
+
+@st.cache_data(show_spinner=False)
+def _load_logo() -> bytes:
+    """Read the logo image once per process."""
+    return Path(LOGO_PATH).read_bytes()
 
 def display_logo() -> None:
     """Display the application logo."""
-    st.image("assets/mara-logo.png", use_container_width=True)
+    st.image(_load_logo(), use_container_width=True)
 
 def input_form(state: AppState, on_submit: Callable) -> None:
     """Display the main input form."""
@@ -28,9 +39,15 @@ def input_form(state: AppState, on_submit: Callable) -> None:
             help="Choose 1-5 iterations. More Iterations = Deeper Insights & Longer Wait."
         )
         
+        parallel = st.checkbox(
+            "Parallel analysis",
+            value=state.parallel_analysis,
+            help="Run iterations concurrently as independent perspectives. Faster, but iterations do not build on each other."
+        )
+        
         if state.stage == 'input':
             if st.form_submit_button("🚀 Start Analysis", use_container_width=True, type="primary"):
-                on_submit(topic, iterations)
+                on_submit(topic, iterations, parallel)
         else:
             if st.form_submit_button("❌ Cancel", use_container_width=True, type="secondary"):
                 state.soft_reset()
@@ -56,32 +73,108 @@ def display_focus_areas(state, handle_continue: Callable, handle_skip: Callable)
         
     with st.expander("🎯 Research Focus Areas", expanded=state.focus_container_expanded):
         if state.selected_focus_areas:
-            # Display selected focus areas as a list
-            st.markdown("## Selected Focus Areas")
-            for area in state.selected_focus_areas:
-                st.markdown(f"• {area}")
+            # Display selected focus areas as a list in a single element
+            st.markdown("## Selected Focus Areas\n\n" + "\n".join(f"- {area}" for area in state.selected_focus_areas))
         else:
             st.markdown("## Select Focus Areas")
             st.markdown("Select up to 5 areas to focus the research on, or skip to analyze all areas.")
+            _select_focus_areas(state.focus_areas, handle_continue, handle_skip)
+
+@st.fragment
+def _select_focus_areas(focus_areas: List[str], handle_continue: Callable, handle_skip: Callable) -> None:
+    """Focus area checkboxes; toggling one reruns only this fragment, not the page."""
+    # Create columns for focus area selection
+    cols = st.columns(2)
+    selected = []
+    
+    for i, area in enumerate(focus_areas):
+        with cols[i % 2]:
+            if st.checkbox(area, key=f"focus_{i}"):
+                selected.append(area)
+    
+    st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Skip", key="skip_focus", type="secondary"):
+            handle_skip()
+    with col2:
+        if st.button("Continue", key="continue_focus", type="primary", disabled=len(selected) > 5):
+            handle_continue(selected)
             
-            # Create columns for focus area selection
-            cols = st.columns(2)
-            selected = []
-            
-            for i, area in enumerate(state.focus_areas):
-                with cols[i % 2]:
-                    if st.checkbox(area, key=f"focus_{i}"):
-                        selected.append(area)
-            
-            st.markdown("---")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("Skip", key="skip_focus", type="secondary"):
-                    handle_skip()
-            with col2:
-                if st.button("Continue", key="continue_focus", type="primary", disabled=len(selected) > 5):
-                    handle_continue(selected)
-                    
-            if len(selected) > 5:
-                st.warning("Please select no more than 5 focus areas.") 
\ No newline at end of file
+    if len(selected) > 5:
+        st.warning("Please select no more than 5 focus areas.")
+
+class _MarkdownStream:
+    """Accumulate streamed text in a placeholder, redrawing at a bounded rate."""
+    
+    def __init__(self, placeholder: st.delta_generator.DeltaGenerator):
+        self.placeholder = placeholder
+        self.buffer: List[str] = []
+        self.pending = 0
+        self.last_flush = time.monotonic()
+    
+    def add(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.buffer.append(chunk)
+        self.pending += len(chunk)
+        
+        # Redraw at a bounded rate regardless of chunk granularity
+        now = time.monotonic()
+        if now - self.last_flush > STREAM_FLUSH_INTERVAL or self.pending > STREAM_FLUSH_CHARS:
+            self.placeholder.markdown("".join(self.buffer))
+            self.last_flush = now
+            self.pending = 0
+    
+    def close(self) -> str:
+        # Final flush
+        text = "".join(self.buffer)
+        self.placeholder.markdown(text)
+        return text
+
+def stream_markdown(chunks: Iterable[str], placeholder: Optional[st.delta_generator.DeltaGenerator] = None) -> str:
+    """Render streamed text into a single placeholder, coalescing redraws."""
+    stream = _MarkdownStream(placeholder or st.empty())
+    for chunk in chunks:
+        stream.add(chunk)
+    return stream.close()
+
+async def stream_markdown_async(chunks: Iterator[str], placeholder: st.delta_generator.DeltaGenerator) -> str:
+    """Like stream_markdown, but waits for each chunk off the event loop."""
+    # Redraws still happen on the event loop thread, which is the script thread
+    stream = _MarkdownStream(placeholder)
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        stream.add(chunk)
+    return stream.close()
+
+def display_report(synthesis: Optional[Dict[str, str]], topic: str) -> None:
+    """Display the final report with a download button."""
+    if not synthesis:
+        return
+    
+    # Create columns for title and download button
+    col1, col2 = st.columns([0.8, 0.2])
+    with col1:
+        st.title(synthesis.get('title', 'Research Results'))
+    with col2:
+        # Download button for report
+        st.download_button(
+            "📥 Download Report",
+            format_result_markdown(synthesis),
+            file_name="research_report.md",
+            mime="text/markdown",
+            key=f"download_synthesis_{topic}",  # Unique key based on topic
+            on_click="ignore",  # Downloading does not need to redraw the report
+            use_container_width=True
+        )
+    
+    # Display content
+    st.markdown(clean_markdown_content(synthesis.get('content', '')))
+
+def display_analyses(analyses: Iterable[Dict[str, str]]) -> None:
+    """Display the research analyses when no synthesis could be generated."""
+    st.warning("The synthesis could not be generated; showing the research analyses instead.")
+    for i, analysis in enumerate(analyses, 1):
+        with st.expander(f"Research Iteration {i}: {analysis.get('title', '')}", expanded=i == 1):
+            st.markdown(clean_markdown_content(format_result_markdown(analysis)))
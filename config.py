@@ -1,9 +1,11 @@
 """Configuration settings for the MARA application."""
 
+import os
 from typing import Dict, Any
 
 # Model Configuration
 GEMINI_MODEL = "learnlm-1.5-pro-experimental"
+GEMINI_TRANSPORT = os.getenv("MARA_GEMINI_TRANSPORT", "grpc")  # gRPC multiplexes calls over one HTTP/2 channel
 
 # Topic Validation
 MIN_TOPIC_LENGTH = 10
@@ -49,6 +51,7 @@ PREANALYSIS_CONFIG = {
 }
 
 ANALYSIS_CONFIG = ProgressiveConfig.get_iteration_config(1)  # Base configuration
+ANALYSIS_FULL_HISTORY_TURNS = 1  # Most recent analyses kept verbatim in the chat; older ones become outlines
 
 SYNTHESIS_CONFIG = {
     'temperature': 0.8,  # Slightly higher for creative synthesis
@@ -57,19 +60,46 @@ SYNTHESIS_CONFIG = {
     'max_output_tokens': 4096,
 }
 
+# Static Assets
+LOGO_PATH = "assets/mara-logo.png"
+
+# Streaming Display
+STREAM_FLUSH_INTERVAL = 0.075  # Minimum seconds between placeholder redraws
+STREAM_FLUSH_CHARS = 512       # Redraw early once this many characters are pending
+
+# Concurrency
+MAX_CONCURRENCY = int(os.getenv("MARA_MAX_CONCURRENCY", "4"))  # Concurrent Gemini calls per session
+PREFETCH_FIRST_ITERATION = os.getenv("MARA_PREFETCH", "1") == "1"  # Speculatively run iteration 1 during focus selection
+
 # Cache Settings
 CACHE_TTL = 3600  # 1 hour in seconds
 
+# Semantic Cache
+EMBEDDING_MODEL = "models/embedding-001"
+SEMANTIC_CACHE_THRESHOLD = 0.92  # Minimum cosine similarity for a cache hit
+SEMANTIC_CACHE_MAX_ENTRIES = 256  # Per agent stage
+SEMANTIC_CACHE_PATH = os.getenv("MARA_CACHE_PATH", os.path.expanduser("~/.mara/cache.db"))  # Empty disables persistence
+PREANALYSIS_PROMPT_VERSION = 2  # Bump when the insight or focus-area prompts change
+
 # Rate Limiting
 API_RATE_LIMIT = {
     'calls': 60,    # Maximum calls
     'period': 60.0  # Time period in seconds
 }
 
+# Logging
+LOG_LEVEL = os.getenv("MARA_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+QUIET_LOGGERS = ('google.generativeai', 'google.auth', 'urllib3', 'grpc')
+
 # Error Handling
 MAX_RETRIES = 3
 BACKOFF_FACTOR = 2.0
 
+# Response Schema
+RESULT_KEYS = frozenset({'title', 'subtitle', 'content'})
+INSIGHT_KEYS = frozenset({'did_you_know', 'eli5'})
+
 # Content Processing
 MAX_FOCUS_AREAS = 5
 MIN_FOCUS_AREAS = 2 
\ No newline at end of file
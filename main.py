@@ -1,24 +1,41 @@
 """Main application module for MARA."""
 
+import asyncio
+import logging
+import os
+import threading
+from types import SimpleNamespace
+
 import streamlit as st
 import google.generativeai as genai
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from agents import PreAnalysisAgent, ResearchAnalyst, SynthesisExpert
+from cache import get_semantic_cache
 from components import (
     display_logo, input_form, display_insights,
-    display_focus_areas
+    display_focus_areas, display_report, display_analyses,
+    stream_markdown, stream_markdown_async
 )
 from config import (
-    GEMINI_MODEL, MIN_TOPIC_LENGTH, MAX_TOPIC_LENGTH,
-    ProgressiveConfig, API_RATE_LIMIT
+    GEMINI_MODEL, GEMINI_TRANSPORT, API_RATE_LIMIT, MAX_CONCURRENCY, CACHE_TTL,
+    PREFETCH_FIRST_ITERATION,
+    LOG_LEVEL, LOG_FORMAT, QUIET_LOGGERS
 )
 from state import AppState
 from utils import (
-    safe_api_call, parse_gemini_response, rate_limit_decorator,
-    clean_markdown_content, GeminiAPIError
+    safe_api_call, rate_limit_decorator,
+    GeminiAPIError, prepare_topic,
+    gather_with_concurrency
 )
 
+# Configure logging; transport libraries only report warnings and above
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+for logger_name in QUIET_LOGGERS:
+    logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+logger = logging.getLogger(__name__)
+
 # Initialize Streamlit page configuration
 st.set_page_config(
     page_title="MARA Research Assistant",
@@ -32,54 +49,168 @@ def initialize_state() -> None:
     if 'app_state' not in st.session_state:
         st.session_state.app_state = AppState()
 
+@st.cache_resource(show_spinner=False)
+def configure_gemini() -> None:
+    """Configure the Gemini client once per process."""
+    # Reconfiguring would discard the shared channel along with the cached clients
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"), transport=GEMINI_TRANSPORT)
+
+@st.cache_resource(show_spinner=False)
 @safe_api_call(retries=3)
 @rate_limit_decorator(calls=API_RATE_LIMIT['calls'], period=API_RATE_LIMIT['period'])
 def initialize_model():
-    """Initialize the Gemini model with error handling."""
+    """Initialize the Gemini model once per process with error handling."""
     try:
+        configure_gemini()
         model = genai.GenerativeModel(GEMINI_MODEL)
         return model
     except Exception as e:
         raise GeminiAPIError(f"Failed to initialize Gemini model: {str(e)}")
 
-def validate_topic(topic: str) -> tuple[bool, str]:
-    """Validate the research topic."""
-    if not topic or not topic.strip():
-        return False, "Please enter a research topic."
-    if len(topic) < MIN_TOPIC_LENGTH:
-        return False, f"Topic must be at least {MIN_TOPIC_LENGTH} characters."
-    if len(topic) > MAX_TOPIC_LENGTH:
-        return False, f"Topic must be no more than {MAX_TOPIC_LENGTH} characters."
-    return True, ""
-
-def handle_topic_submission(topic: str, iterations: int) -> None:
-    """Handle topic submission with error handling."""
+@st.cache_resource(show_spinner=False)
+def get_agents(_model) -> SimpleNamespace:
+    """Build the agent set once for the shared model; agents hold no per-run state."""
+    return SimpleNamespace(
+        pre_analysis=PreAnalysisAgent(_model),
+        research=ResearchAnalyst(_model),
+        synthesis=SynthesisExpert(_model)
+    )
+
+@st.cache_resource(show_spinner=False)
+def prewarm_connection() -> None:
+    """Open the Gemini connection in the background before the first agent call."""
     try:
-        # Validate topic
-        is_valid, error_message = validate_topic(topic)
-        if not is_valid:
+        model = initialize_model()
+    except GeminiAPIError as e:
+        logger.warning("Skipping connection prewarm: %s", e)
+        return
+    
+    def warm() -> None:
+        try:
+            # Same service client as generation, without generating anything
+            model.count_tokens("ping")
+        except Exception as e:
+            logger.debug("Connection prewarm failed: %s", e)
+    
+    threading.Thread(target=warm, name="gemini-prewarm", daemon=True).start()
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def get_research_slot(
+    topic: str,
+    focus_areas: Tuple[str, ...],
+    iterations: int,
+    parallel_analysis: bool
+) -> Dict[str, Any]:
+    """Shared slot for the finished report of one research request."""
+    return {}
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def get_iteration_texts(
+    topic: str,
+    focus_areas: Tuple[str, ...],
+    parallel_analysis: bool
+) -> Dict[int, str]:
+    """Shared store of raw analysis text by iteration number."""
+    return {}
+
+@st.cache_resource(show_spinner=False)
+def get_prefetches() -> Dict[Tuple[str, bool], Tuple[threading.Thread, threading.Event]]:
+    """Speculative first iterations still running and their cancel flags, by (topic, parallel mode)."""
+    return {}
+
+def prefetch_first_iteration(analyst: ResearchAnalyst, topic: str, parallel_analysis: bool) -> None:
+    """Start the unfocused first iteration while the user picks focus areas."""
+    texts = get_iteration_texts(topic, (), parallel_analysis)
+    prefetches = get_prefetches()
+    key = (topic, parallel_analysis)
+    if 1 in texts or key in prefetches:
+        return
+    
+    cancelled = threading.Event()
+    
+    def run() -> None:
+        chunks = analyst.analyze_stream(topic, [], 1, standalone=parallel_analysis)
+        try:
+            parts = []
+            for chunk in chunks:
+                # Stop paying for output once focus areas make the text unusable
+                if cancelled.is_set():
+                    return
+                parts.append(chunk)
+            text = "".join(parts)
+            if text:
+                texts[1] = text
+        except Exception as e:
+            logger.debug("First iteration prefetch failed: %s", e)
+        finally:
+            chunks.close()
+            prefetches.pop(key, None)
+    
+    thread = threading.Thread(target=run, name="analysis-prefetch", daemon=True)
+    prefetches[key] = (thread, cancelled)
+    thread.start()
+
+def cancel_prefetch(topic: str, parallel_analysis: bool) -> None:
+    """Stop a speculative first iteration whose result will not be used."""
+    prefetch = get_prefetches().get((topic, parallel_analysis))
+    if prefetch:
+        prefetch[1].set()
+
+async def run_pre_analysis(
+    pre_analyst: PreAnalysisAgent,
+    topic: str,
+    topic_embedding,
+    refresh: bool = False
+) -> Tuple[Optional[Dict[str, str]], Optional[List[str]]]:
+    """Fetch insights and focus areas concurrently; both depend only on the topic."""
+    cache = get_semantic_cache()
+    insights, focus_areas = await asyncio.gather(
+        cache.get_or_compute_async(
+            'insights', topic_embedding, lambda: pre_analyst.generate_insights_async(topic), refresh
+        ),
+        cache.get_or_compute_async(
+            'focus_areas', topic_embedding, lambda: pre_analyst.generate_focus_areas_async(topic), refresh
+        )
+    )
+    return insights, focus_areas
+
+def handle_topic_submission(
+    topic: str,
+    iterations: int,
+    parallel_analysis: bool = False,
+    refresh: bool = False
+) -> None:
+    """Handle topic submission with error handling; refresh bypasses cached responses."""
+    try:
+        # Sanitize and validate topic
+        topic, error_message = prepare_topic(topic)
+        if error_message:
             st.error(error_message)
             return
             
         state = st.session_state.app_state
-        state.last_topic = topic
-        state.iterations = iterations
-        state.stage = 'analysis'
         
-        # Initialize model
-        model = initialize_model()
+        # Initialize model and agents
+        agents = get_agents(initialize_model())
         
-        # Generate initial insights
-        pre_analyst = PreAnalysisAgent(model)
+        # Generate initial insights, reusing responses for near-identical topics
         with st.spinner("Generating initial insights..."):
-            insights = pre_analyst.generate_insights(topic)
-            if insights:
-                state.insights = insights
-                
-            focus_areas = pre_analyst.generate_focus_areas(topic)
-            if focus_areas:
-                state.focus_areas = focus_areas
-                
+            topic_embedding = get_semantic_cache().embed(topic)
+            insights, focus_areas = asyncio.run(
+                run_pre_analysis(agents.pre_analysis, topic, topic_embedding, refresh)
+            )
+        
+        # Commit the submission and its results in one state write
+        state.update(
+            last_topic=topic,
+            iterations=iterations,
+            parallel_analysis=parallel_analysis,
+            stage='analysis',
+            insights=insights,
+            focus_areas=focus_areas or []
+        )
+        if PREFETCH_FIRST_ITERATION and focus_areas:
+            prefetch_first_iteration(agents.research, topic, parallel_analysis)
         st.rerun()
         
     except GeminiAPIError as e:
@@ -94,56 +225,181 @@ def handle_focus_selection(selected_areas: List[str]) -> None:
         st.error("Please select no more than 5 focus areas.")
         return
         
-    state.selected_focus_areas = selected_areas
-    state.stage = 'research'
+    if selected_areas:
+        cancel_prefetch(state.last_topic, state.parallel_analysis)
+    state.update(selected_focus_areas=tuple(selected_areas), stage='research')
     st.rerun()
 
+async def run_parallel_analyses(
+    analyst: ResearchAnalyst,
+    topic: str,
+    focus_areas: List[str],
+    placeholders: List[st.delta_generator.DeltaGenerator],
+    texts: Dict[int, str],
+    on_complete: Optional[Callable[[int, Optional[Dict[str, str]]], None]] = None
+) -> List[Optional[Dict[str, str]]]:
+    """Stream independent analyses concurrently, bounded by MAX_CONCURRENCY."""
+    # on_complete runs on the event loop thread, so it may safely update Streamlit elements
+    async def run_one(iteration: int) -> Optional[Dict[str, str]]:
+        try:
+            text = texts.get(iteration)
+            if text:
+                placeholders[iteration - 1].markdown(text)
+            else:
+                text = await stream_markdown_async(
+                    analyst.analyze_stream(topic, focus_areas, iteration),
+                    placeholders[iteration - 1]
+                )
+                if text:
+                    texts[iteration] = text
+            analysis = analyst.parse_analysis(text, iteration)
+        except GeminiAPIError as e:
+            # One failed iteration should not discard the others
+            logger.error("Analysis iteration %d failed: %s", iteration, e)
+            placeholders[iteration - 1].empty()
+            analysis = None
+        if on_complete:
+            on_complete(iteration, analysis)
+        return analysis
+    
+    return await gather_with_concurrency(
+        MAX_CONCURRENCY,
+        *(run_one(i) for i in range(1, len(placeholders) + 1))
+    )
+
 def conduct_research() -> None:
     """Conduct progressive research analysis."""
     try:
         state = st.session_state.app_state
-        model = initialize_model()
-        analyst = ResearchAnalyst(model)
+        research_slot = get_research_slot(
+            state.last_topic,
+            state.selected_focus_areas,
+            state.iterations,
+            state.parallel_analysis
+        )
+        if research_slot.get('synthesis'):
+            state.update(
+                analysis_results=research_slot['analyses'],
+                synthesis=research_slot['synthesis'],
+                stage='complete'
+            )
+            return
+        
+        agents = get_agents(initialize_model())
+        analyst = agents.research
+        
+        progress_bar = st.progress(0, text="Preparing research...")
         
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Use the speculative first iteration rather than requesting it twice
+        prefetch = get_prefetches().get((state.last_topic, state.parallel_analysis))
+        if prefetch and not state.selected_focus_areas:
+            prefetch[0].join()
         
         analyses = []
-        for i in range(state.iterations):
-            iteration = i + 1
-            status_text.text(f"Research Iteration {iteration}/{state.iterations}")
+        texts = get_iteration_texts(
+            state.last_topic,
+            state.selected_focus_areas,
+            state.parallel_analysis
+        )
+        if state.parallel_analysis and state.iterations > 1:
+            # Fan out: each iteration explores its own depth independently
+            progress_bar.progress(0, text=f"Running {state.iterations} analyses in parallel")
+            completed = 0
             
-            # Get progressive configuration
-            config = ProgressiveConfig.get_iteration_config(iteration)
-            model.generation_config = genai.types.GenerationConfig(**config)
-            
-            # Conduct analysis
-            analysis = analyst.analyze(
-                state.last_topic,
-                state.selected_focus_areas,
-                '\n'.join(str(a) for a in analyses) if analyses else None
-            )
+            def count_analysis(iteration: int, analysis: Optional[Dict[str, str]]) -> None:
+                nonlocal completed
+                completed += 1
+                progress_bar.progress(
+                    completed / state.iterations,
+                    text=f"Completed {completed}/{state.iterations} analyses"
+                )
             
-            if analysis:
-                analyses.append(analysis)
-                
-            progress = (i + 1) / state.iterations
-            progress_bar.progress(progress)
+            # Every iteration streams into its own expander as tokens arrive
+            placeholders = []
+            for i in range(state.iterations):
+                with st.expander(f"Research Iteration {i + 1}", expanded=True):
+                    placeholders.append(st.empty())
             
-        # Generate synthesis
-        if analyses:
-            synthesizer = SynthesisExpert(model)
-            synthesis = synthesizer.synthesize(
+            results = asyncio.run(run_parallel_analyses(
+                analyst,
                 state.last_topic,
                 state.selected_focus_areas,
-                analyses
-            )
-            
-            if synthesis:
-                state.synthesis = synthesis
+                placeholders,
+                texts,
+                on_complete=count_analysis
+            ))
+            analyses = [analysis for analysis in results if analysis]
+        else:
+            # One chat session carries earlier iterations as history; it is started
+            # at the first iteration not reused from cache
+            session = None
+            for i in range(state.iterations):
+                iteration = i + 1
+                progress_bar.progress(i / state.iterations, text=f"Research Iteration {iteration}/{state.iterations}")
                 
-        state.stage = 'complete'
-        st.rerun()
+                # Stream the analysis as it is written; the analyst applies the progressive config
+                with st.expander(f"Research Iteration {iteration}", expanded=True):
+                    text = texts.get(iteration)
+                    if text:
+                        st.markdown(text)
+                    else:
+                        if session is None:
+                            session = analyst.start_session(
+                                state.last_topic,
+                                state.selected_focus_areas,
+                                [texts[j] for j in range(1, iteration) if j in texts]
+                            )
+                        placeholder = st.empty()
+                        try:
+                            text = stream_markdown(analyst.analyze_in_session_stream(
+                                session,
+                                state.last_topic,
+                                state.selected_focus_areas,
+                                iteration
+                            ), placeholder)
+                        except GeminiAPIError as e:
+                            # One failed iteration should not discard the others
+                            logger.error("Analysis iteration %d failed: %s", iteration, e)
+                            placeholder.empty()
+                            text = None
+                        if text:
+                            texts[iteration] = text
+                analysis = analyst.parse_analysis(text, iteration)
+                
+                if analysis:
+                    analyses.append(analysis)
+                    
+                progress = (i + 1) / state.iterations
+                progress_bar.progress(progress, text=f"Research Iteration {iteration}/{state.iterations}")
+            
+        # Generate synthesis; a lone analysis is already the final report
+        synthesis = None
+        if len(analyses) == 1:
+            synthesis = dict(analyses[0])
+        elif analyses:
+            progress_bar.progress(1.0, text="Synthesizing findings...")
+            placeholder = st.empty()
+            try:
+                text = stream_markdown(agents.synthesis.synthesize_stream(
+                    state.last_topic,
+                    state.selected_focus_areas,
+                    analyses
+                ), placeholder)
+                synthesis = agents.synthesis.parse_synthesis(text)
+            except GeminiAPIError as e:
+                # A stream that broke off mid-report cannot be resumed; request it whole instead
+                logger.error("Synthesis stream failed: %s", e)
+                placeholder.empty()
+                synthesis = agents.synthesis.synthesize(
+                    state.last_topic,
+                    state.selected_focus_areas,
+                    analyses
+                )
+        
+        analysis_results = tuple(analyses)
+        if synthesis:
+            research_slot.update(analyses=analysis_results, synthesis=synthesis)
+        state.update(analysis_results=analysis_results, synthesis=synthesis, stage='complete')
         
     except GeminiAPIError as e:
         st.error(f"API Error: {str(e)}")
@@ -152,59 +408,61 @@ def conduct_research() -> None:
         st.error(f"An unexpected error occurred: {str(e)}")
         state.stage = 'input'
 
+def regenerate_research() -> None:
+    """Discard every stored response for the current request and start it again."""
+    state = st.session_state.app_state
+    get_research_slot(
+        state.last_topic,
+        state.selected_focus_areas,
+        state.iterations,
+        state.parallel_analysis
+    ).clear()
+    get_iteration_texts(state.last_topic, state.selected_focus_areas, state.parallel_analysis).clear()
+    get_iteration_texts(state.last_topic, (), state.parallel_analysis).clear()
+    handle_topic_submission(state.last_topic, state.iterations, state.parallel_analysis, refresh=True)
+
+def display_results(state: AppState) -> None:
+    """Show the synthesis, or the analyses it would have been built from."""
+    if state.synthesis:
+        display_report(state.synthesis, state.last_topic)
+    elif state.analysis_results:
+        display_analyses(state.analysis_results)
+    
+    # Reports are shared across sessions, so offer a way past a stored one
+    if st.button("🔄 Regenerate Report", key="regenerate_report", type="secondary"):
+        regenerate_research()
+
 def main():
     """Main application entry point."""
     initialize_state()
+    prewarm_connection()
     state = st.session_state.app_state
     
     # Display logo
     display_logo()
     
+    # Input form is shown at every stage
+    input_form(state, handle_topic_submission)
+    
     # Handle different application stages
-    if state.stage == 'input':
-        input_form(state, handle_topic_submission)
-        
-    elif state.stage == 'analysis':
-        input_form(state, handle_topic_submission)
+    if state.stage == 'analysis':
         display_insights(state.insights)
         display_focus_areas(state, handle_focus_selection, lambda: handle_focus_selection([]))
         
     elif state.stage == 'research':
-        input_form(state, handle_topic_submission)
-        display_insights(state.insights)
-        conduct_research()
+        # Research renders into one area that is swapped for the report when done,
+        # so finishing does not need another full script run
+        research_area = st.empty()
+        with research_area.container():
+            display_insights(state.insights)
+            conduct_research()
         
-    elif state.stage == 'complete':
-        input_form(state, handle_topic_submission)
+        if state.stage == 'complete':
+            research_area.empty()
+            display_results(state)
         
-        if state.synthesis:
-            # Ensure synthesis persists in session state
-            synthesis_key = f"synthesis_{state.last_topic}"
-            if synthesis_key not in st.session_state:
-                st.session_state[synthesis_key] = state.synthesis
-            
-            synthesis = st.session_state[synthesis_key]
-            
-            # Create columns for title and download button
-            col1, col2 = st.columns([0.8, 0.2])
-            with col1:
-                st.title(synthesis.get('title', 'Research Results'))
-            with col2:
-                # Download button for report
-                report_content = f"# {synthesis.get('title', 'Research Results')}\n\n"
-                report_content += synthesis.get('content', '')
-                
-                st.download_button(
-                    "📥 Download Report",
-                    report_content,
-                    file_name="research_report.md",
-                    mime="text/markdown",
-                    key=f"download_{synthesis_key}",  # Unique key based on topic
-                    use_container_width=True
-                )
-            
-            # Display content
-            st.markdown(clean_markdown_content(synthesis.get('content', '')))
+    elif state.stage == 'complete':
+        display_results(state)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,9 +1,13 @@
 """State management for the MARA application."""
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import streamlit as st
 
+from config import RESULT_KEYS
+
+VALID_STAGES = frozenset({'input', 'analysis', 'research', 'complete'})
+
 @dataclass
 class AppState:
     """Application state management with validation and persistence."""
@@ -11,17 +15,20 @@ class AppState:
     # User input state
     last_topic: str = field(default="")
     iterations: int = field(default=1)
+    parallel_analysis: bool = field(default=False)
     
     # Analysis state
     stage: str = field(default="input")
     insights: Optional[Dict[str, str]] = field(default=None)
     focus_areas: List[str] = field(default_factory=list)
-    selected_focus_areas: List[str] = field(default_factory=list)
+    # Hashable so it can key the research caches directly
+    selected_focus_areas: Tuple[str, ...] = field(default=())
     focus_container_expanded: bool = field(default=True)
     
     # Research state
     current_iteration: int = field(default=0)
-    analysis_results: List[Dict[str, str]] = field(default_factory=list)
+    # Frozen once written; results are replaced, never mutated in place
+    analysis_results: Tuple[Dict[str, str], ...] = field(default=())
     synthesis: Optional[Dict[str, str]] = field(default=None)
     
     def __post_init__(self):
@@ -31,8 +38,7 @@ class AppState:
     def validate_state(self) -> None:
         """Validate state integrity."""
         # Validate stage
-        valid_stages = {'input', 'analysis', 'research', 'complete'}
-        if self.stage not in valid_stages:
+        if self.stage not in VALID_STAGES:
             self.stage = 'input'
         
         # Validate iterations
@@ -51,14 +57,13 @@ class AppState:
     
     def soft_reset(self) -> None:
         """Reset analysis state while preserving last topic."""
-        self.stage = 'input'
-        self.insights = None
-        self.focus_areas = []
-        self.selected_focus_areas = []
-        self.focus_container_expanded = True
-        self.current_iteration = 0
-        self.analysis_results = []
-        self.synthesis = None
+        # Take every analysis field from a fresh instance in one reassignment
+        defaults = AppState(
+            last_topic=self.last_topic,
+            iterations=self.iterations,
+            parallel_analysis=self.parallel_analysis
+        )
+        self.__dict__.update(defaults.__dict__)
         
         # Persist state
         self.persist_state()
@@ -67,12 +72,15 @@ class AppState:
         """Complete state reset."""
         self.last_topic = ""
         self.iterations = 1
+        self.parallel_analysis = False
         self.soft_reset()
     
     def persist_state(self) -> None:
         """Persist state to session storage."""
-        for field_name, field_value in self.__dict__.items():
-            st.session_state[f'mara_{field_name}'] = field_value
+        st.session_state.update({
+            f'mara_{field_name}': field_value
+            for field_name, field_value in self.__dict__.items()
+        })
     
     def load_persisted_state(self) -> None:
         """Load state from session storage."""
@@ -84,10 +92,19 @@ class AppState:
         # Validate after loading
         self.validate_state()
     
+    def update(self, **changes: Any) -> None:
+        """Apply several field changes with a single validation and persist."""
+        for field_name, field_value in changes.items():
+            if field_name not in self.__dataclass_fields__:
+                raise AttributeError(f"Unknown state field: {field_name}")
+            setattr(self, field_name, field_value)
+        
+        self.validate_state()
+        self.persist_state()
+    
     def update_stage(self, new_stage: str) -> None:
         """Update stage with validation."""
-        valid_stages = {'input', 'analysis', 'research', 'complete'}
-        if new_stage in valid_stages:
+        if new_stage in VALID_STAGES:
             self.stage = new_stage
             self.persist_state()
     
@@ -96,11 +113,10 @@ class AppState:
         if not isinstance(result, dict):
             return
             
-        required_keys = {'title', 'subtitle', 'content'}
-        if not all(key in result for key in required_keys):
+        if not RESULT_KEYS.issubset(result):
             return
             
-        self.analysis_results.append(result)
+        self.analysis_results += (result,)
         self.current_iteration += 1
         self.persist_state()
     
@@ -109,8 +125,7 @@ class AppState:
         if not isinstance(synthesis, dict):
             return
             
-        required_keys = {'title', 'subtitle', 'content'}
-        if not all(key in synthesis for key in required_keys):
+        if not RESULT_KEYS.issubset(synthesis):
             return
             
         self.synthesis = synthesis
@@ -0,0 +1,58 @@
+"""Tests for chat history condensing in the research analyst."""
+
+from types import SimpleNamespace
+
+from agents import ResearchAnalyst
+from config import ANALYSIS_FULL_HISTORY_TURNS
+
+ANALYSIS = """# Title
+*Subtitle*
+
+Lead sentence one. Second sentence. Third sentence.
+More of the first paragraph.
+
+## Section
+1. Numbered point. With detail
+- Bullet point
+  continued bullet text. More
+
+Closing paragraph lead? Trailing sentence."""
+
+def _as_history(turns):
+    """Turn role/parts dicts into objects shaped like chat session history."""
+    return [
+        SimpleNamespace(role=turn['role'], parts=[SimpleNamespace(text=text) for text in turn['parts']])
+        for turn in turns
+    ]
+
+def _chat(iterations):
+    turns = []
+    for iteration in range(1, iterations + 1):
+        turns.append({'role': 'user', 'parts': [f"iteration {iteration}"]})
+        turns.append({'role': 'model', 'parts': [ANALYSIS]})
+    return turns
+
+def test_outline_is_idempotent():
+    outline = ResearchAnalyst._outline(ANALYSIS)
+    assert ResearchAnalyst._outline(outline) == outline
+    assert "Lead sentence one." in outline
+    assert "Closing paragraph lead?" in outline
+    assert "Second sentence" not in outline
+
+def test_condensing_twice_gives_the_same_history():
+    analyst = ResearchAnalyst(model=None)
+    once = analyst._condense_history(_as_history(_chat(ANALYSIS_FULL_HISTORY_TURNS + 2)))
+    twice = analyst._condense_history(_as_history(once))
+    assert twice == once
+
+def test_each_turn_is_outlined_once_as_it_leaves_the_window():
+    analyst = ResearchAnalyst(model=None)
+    history = []
+    for _ in range(4):
+        if history:
+            history = analyst._condense_history(_as_history(history))
+        history += _chat(1)
+    model_texts = [turn['parts'][0] for turn in history if turn['role'] == 'model']
+    outline = ResearchAnalyst._outline(ANALYSIS)
+    recent = len(model_texts) - ANALYSIS_FULL_HISTORY_TURNS
+    assert model_texts == [outline if i < recent - 1 else ANALYSIS for i in range(len(model_texts))]
@@ -1,17 +1,25 @@
 """Utility functions for the MARA application."""
 
+import ast
+import asyncio
+import json
 import logging
+import re
 import time
-from functools import wraps
-from typing import Any, Callable, Dict, Optional, TypeVar, List
-from google.api_core import retry, exceptions
+from functools import lru_cache, wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar, List, Tuple
+from google.api_core import exceptions
 from google.generativeai.types import GenerateContentResponse
-import google.generativeai.types as gemini_types
+
+from config import MIN_TOPIC_LENGTH, MAX_TOPIC_LENGTH
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+# Topic whitespace pattern, compiled once at import
+_WHITESPACE_RE = re.compile(r"\s+")
+
 class GeminiAPIError(Exception):
     """Custom exception for Gemini API-related errors that follows Google's guidelines."""
     def __init__(self, message: str, error_type: Optional[str] = None):
@@ -31,18 +39,26 @@ def safe_api_call(retries: int = 3, backoff: float = 2.0) -> Callable:
                     # Handle Google API specific errors
                     if attempt < retries - 1:
                         wait_time = backoff ** attempt
-                        logger.warning(f"Gemini API call failed (attempt {attempt + 1}/{retries}). Retrying in {wait_time}s...")
+                        logger.warning("Gemini API call failed (attempt %d/%d). Retrying in %ss...", attempt + 1, retries, wait_time)
                         time.sleep(wait_time)
                     else:
-                        logger.error(f"Gemini API call failed after {retries} attempts")
+                        logger.error("Gemini API call failed after %d attempts", retries)
                         raise GeminiAPIError(str(e), error_type="API_ERROR")
                 except Exception as e:
                     # Handle other errors
-                    logger.error(f"Unexpected error in Gemini API call: {str(e)}")
+                    logger.error("Unexpected error in Gemini API call: %s", e)
                     raise GeminiAPIError(str(e), error_type="UNEXPECTED_ERROR")
         return wrapper
     return decorator
 
+def parse_literal(text: str) -> Any:
+    """Parse model output as a Python literal, falling back to JSON; raises ValueError if both fail."""
+    try:
+        # ast.literal_eval first for safety
+        return ast.literal_eval(text)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return json.loads(text)
+
 def parse_gemini_response(response: GenerateContentResponse) -> Dict[str, Any]:
     """Safely parse Gemini API response following Google's guidelines."""
     if not response:
@@ -72,17 +88,10 @@ def parse_gemini_response(response: GenerateContentResponse) -> Dict[str, Any]:
         
         # Try multiple parsing approaches
         try:
-            # First try ast.literal_eval for safety
-            import ast
-            result = ast.literal_eval(text)
-        except:
-            try:
-                # Try json.loads as fallback
-                import json
-                result = json.loads(text)
-            except:
-                # Return raw text if parsing fails
-                result = {"content": text}
+            result = parse_literal(text)
+        except ValueError:
+            # Return raw text if parsing fails
+            result = {"content": text}
                 
         return result
         
@@ -135,6 +144,17 @@ class TokenBucket:
             
         self.current_tokens -= tokens
 
+async def gather_with_concurrency(limit: int, *awaitables: Awaitable[T]) -> List[T]:
+    """Await all awaitables with at most `limit` in flight, preserving order."""
+    # Each slot frees as its call finishes, so the next starts without waiting for a batch
+    semaphore = asyncio.Semaphore(max(1, limit))
+    
+    async def bounded(awaitable: Awaitable[T]) -> T:
+        async with semaphore:
+            return await awaitable
+    
+    return await asyncio.gather(*(bounded(awaitable) for awaitable in awaitables))
+
 def validate_response_format(response: Dict[str, Any], required_keys: List[str]) -> bool:
     """Validate response format against required keys."""
     return all(key in response for key in required_keys)
@@ -161,4 +181,26 @@ def clean_markdown_content(content: str) -> str:
             if not line.strip():
                 current_level = 0
                 
-    return '\n'.join(cleaned_lines) 
\ No newline at end of file
+    return '\n'.join(cleaned_lines) 
+
+def format_result_markdown(result: Dict[str, str]) -> str:
+    """Render a title/subtitle/content result as one markdown document."""
+    heading = f"# {result['title']}\n\n" if result.get('title') else ""
+    tagline = f"*{result['subtitle']}*\n\n" if result.get('subtitle') else ""
+    return f"{heading}{tagline}{result.get('content') or ''}"
+
+def sanitize_topic(topic: str) -> str:
+    """Collapse whitespace in a topic; its characters are passed on unchanged."""
+    return _WHITESPACE_RE.sub(" ", topic).strip()
+
+@lru_cache(maxsize=256)
+def prepare_topic(topic: str) -> Tuple[str, str]:
+    """Sanitize and validate a topic, returning it with an error message that is empty when valid."""
+    topic = sanitize_topic(topic)
+    if not topic:
+        return topic, "Please enter a research topic."
+    if len(topic) < MIN_TOPIC_LENGTH:
+        return topic, f"Topic must be at least {MIN_TOPIC_LENGTH} characters."
+    if len(topic) > MAX_TOPIC_LENGTH:
+        return topic, f"Topic must be no more than {MAX_TOPIC_LENGTH} characters."
+    return topic, ""